@@ -5,8 +5,10 @@ Usage:
     REVIEW_OWNER=owner REVIEW_REPO=repo REVIEW_PR_NUMBER=42 uv run python python.py
 """
 import asyncio
+import importlib.util
 import os
 import sys
+from types import MappingProxyType
 
 import httpx
 from pydantic import BaseModel, Field
@@ -22,6 +24,26 @@ from copilot.tools import define_tool
 
 _MAX_RETRIES = 3
 
+# The token and request headers are resolved once at import and shared,
+# read-only, by every request.
+_GH_TOKEN = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN", "")
+_GH_AUTH = {"Authorization": f"Bearer {_GH_TOKEN}"} if _GH_TOKEN else {}
+_GH_DIFF_HEADERS = MappingProxyType({"Accept": "application/vnd.github.v3.diff", **_GH_AUTH})
+_GH_JSON_HEADERS = MappingProxyType({"Accept": "application/vnd.github.v3+json", **_GH_AUTH})
+
+# Shared HTTP client, created once in main() and reused by every tool call so
+# repeated GitHub API requests keep their TCP/TLS connections alive.
+_HTTP: httpx.AsyncClient | None = None
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """Build the shared client; HTTP/2 is enabled when the optional h2 package is installed."""
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=httpx.Timeout(30.0),
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    )
+
 
 async def _github_request_with_retry(
     http: httpx.AsyncClient,
@@ -41,6 +63,34 @@ async def _github_request_with_retry(
     return response  # return last response after exhausting retries
 
 
+# GitHub caps list endpoints at 100 items per page; /pulls/{n}/files itself
+# stops at 3000 files, i.e. 30 pages.
+_MAX_PAGES = 30
+
+
+async def _github_get_all_pages(url: str) -> tuple[httpx.Response, list, bool]:
+    """GET every page of a GitHub list endpoint by following ``Link: rel="next"``.
+
+    Returns the last response (check its status), the items collected so far,
+    and whether _MAX_PAGES was reached before the last page.
+    """
+    items: list = []
+    params: dict | None = {"per_page": 100}
+    for _ in range(_MAX_PAGES):
+        response = await _github_request_with_retry(
+            _HTTP, "GET", url, headers=_GH_JSON_HEADERS, params=params
+        )
+        if response.status_code != 200:
+            return response, items, False
+        items.extend(response.json())
+        next_page = response.links.get("next")
+        if next_page is None:
+            return response, items, False
+        # The next-page URL already carries per_page and page.
+        url, params = next_page["url"], None
+    return response, items, True
+
+
 # ---------------------------------------------------------------------------
 # Tool definitions
 # ---------------------------------------------------------------------------
@@ -61,20 +111,29 @@ class PostCommentParams(BaseModel):
     body: str = Field(description="Comment text (supports Markdown)")
 
 
+class ReviewComment(BaseModel):
+    path: str = Field(description="File path relative to repo root")
+    line: int = Field(description="Line number in the diff")
+    body: str = Field(description="Comment text (supports Markdown)")
+
+
+class SubmitReviewParams(BaseModel):
+    owner: str
+    repo: str
+    pr_number: int
+    commit_id: str = Field(description="Latest commit SHA on the PR")
+    body: str = Field(default="", description="Overall review summary (supports Markdown)")
+    comments: list[ReviewComment] = Field(description="Inline comments to post with the review")
+
+
 @define_tool(description="Fetch the unified diff for a pull request")
 async def fetch_diff(params: FetchDiffParams) -> dict:
-    token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN", "")
-    headers = {"Accept": "application/vnd.github.v3.diff"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-
-    async with httpx.AsyncClient() as http:
-        response = await _github_request_with_retry(
-            http,
-            "GET",
-            f"https://api.github.com/repos/{params.owner}/{params.repo}/pulls/{params.pr_number}",
-            headers=headers,
-        )
+    response = await _github_request_with_retry(
+        _HTTP,
+        "GET",
+        f"https://api.github.com/repos/{params.owner}/{params.repo}/pulls/{params.pr_number}",
+        headers=_GH_DIFF_HEADERS,
+    )
 
     if response.status_code == 429:
         return {"error": "GitHub API rate limit exceeded. Please retry later."}
@@ -83,16 +142,66 @@ async def fetch_diff(params: FetchDiffParams) -> dict:
     return {"diff": response.text}
 
 
+@define_tool(
+    description=(
+        "Fetch everything needed to review a pull request in one call: the unified diff, "
+        "the head commit SHA, the changed files, and existing review comments"
+    )
+)
+async def fetch_pr_context(params: FetchDiffParams) -> dict:
+    pr_url = f"https://api.github.com/repos/{params.owner}/{params.repo}/pulls/{params.pr_number}"
+    # The four resources are independent, so fetch them concurrently over the
+    # shared client instead of chaining one round trip (and tool call) per resource.
+    # The file and comment lists are paginated and follow their next links.
+    results = await asyncio.gather(
+        _github_request_with_retry(_HTTP, "GET", pr_url, headers=_GH_DIFF_HEADERS),
+        _github_request_with_retry(_HTTP, "GET", pr_url, headers=_GH_JSON_HEADERS),
+        _github_get_all_pages(f"{pr_url}/files"),
+        _github_get_all_pages(f"{pr_url}/comments"),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            return {"error": f"GitHub API request failed: {result}"}
+        response = result[0] if isinstance(result, tuple) else result
+        if response.status_code == 429:
+            return {"error": "GitHub API rate limit exceeded. Please retry later."}
+        if response.status_code != 200:
+            return {"error": f"GitHub API error: {response.status_code}"}
+
+    diff_response, pr_response, (_, files, files_truncated), (_, comments, comments_truncated) = (
+        results
+    )
+    return {
+        "diff": diff_response.text,
+        "commit_id": pr_response.json()["head"]["sha"],
+        "files": [
+            {
+                "filename": f["filename"],
+                "status": f["status"],
+                "additions": f["additions"],
+                "deletions": f["deletions"],
+            }
+            for f in files
+        ],
+        "existing_comments": [
+            {
+                "path": c["path"],
+                "line": c.get("line"),
+                "body": c["body"],
+                "user": (c.get("user") or {}).get("login"),
+            }
+            for c in comments
+        ],
+        # True only if a list was cut off at _MAX_PAGES pages.
+        "truncated": files_truncated or comments_truncated,
+    }
+
+
 @define_tool(description="Post an inline review comment on a specific line of a PR")
 async def post_review_comment(params: PostCommentParams) -> dict:
-    token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN", "")
-    if not token:
+    if not _GH_TOKEN:
         return {"error": "GITHUB_TOKEN or GH_TOKEN environment variable is required to post review comments"}
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
     payload = {
         "body": params.body,
         "commit_id": params.commit_id,
@@ -100,14 +209,13 @@ async def post_review_comment(params: PostCommentParams) -> dict:
         "line": params.line,
         "side": "RIGHT",
     }
-    async with httpx.AsyncClient() as http:
-        response = await _github_request_with_retry(
-            http,
-            "POST",
-            f"https://api.github.com/repos/{params.owner}/{params.repo}/pulls/{params.pr_number}/comments",
-            headers=headers,
-            json=payload,
-        )
+    response = await _github_request_with_retry(
+        _HTTP,
+        "POST",
+        f"https://api.github.com/repos/{params.owner}/{params.repo}/pulls/{params.pr_number}/comments",
+        headers=_GH_JSON_HEADERS,
+        json=payload,
+    )
     if response.status_code == 429:
         return {"error": "GitHub API rate limit exceeded. Please retry later."}
     if response.status_code not in (200, 201):
@@ -116,6 +224,39 @@ async def post_review_comment(params: PostCommentParams) -> dict:
     return {"comment_id": data["id"], "url": data["html_url"]}
 
 
+@define_tool(
+    description=(
+        "Submit a pull request review with all inline comments in a single call. "
+        "Prefer this over post_review_comment when there is more than one finding"
+    )
+)
+async def submit_review(params: SubmitReviewParams) -> dict:
+    if not _GH_TOKEN:
+        return {"error": "GITHUB_TOKEN or GH_TOKEN environment variable is required to submit reviews"}
+    payload = {
+        "commit_id": params.commit_id,
+        "body": params.body,
+        "event": "COMMENT",
+        "comments": [
+            {"path": c.path, "line": c.line, "side": "RIGHT", "body": c.body}
+            for c in params.comments
+        ],
+    }
+    response = await _github_request_with_retry(
+        _HTTP,
+        "POST",
+        f"https://api.github.com/repos/{params.owner}/{params.repo}/pulls/{params.pr_number}/reviews",
+        headers=_GH_JSON_HEADERS,
+        json=payload,
+    )
+    if response.status_code == 429:
+        return {"error": "GitHub API rate limit exceeded. Please retry later."}
+    if response.status_code not in (200, 201):
+        return {"error": f"GitHub API error: {response.status_code}"}
+    data = response.json()
+    return {"review_id": data["id"], "url": data["html_url"], "comment_count": len(params.comments)}
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -126,6 +267,17 @@ PR_NUMBER = int(os.environ.get("REVIEW_PR_NUMBER", "1"))
 
 
 async def main() -> None:
+    global _HTTP
+    _HTTP = _create_http_client()
+    # Closed in its own finally so it is released even when the client fails to
+    # start or stop.
+    try:
+        await _review()
+    finally:
+        await _HTTP.aclose()
+
+
+async def _review() -> None:
     client = CopilotClient()
     await client.start()
 
@@ -137,11 +289,13 @@ async def main() -> None:
                 "You are a senior software engineer conducting a thorough code review. "
                 "Identify security vulnerabilities, logic errors, and performance anti-patterns. "
                 "Be constructive and specific. Reference file paths and line numbers. "
+                "When posting inline comments, batch all of them into a single submit_review "
+                "call instead of calling post_review_comment once per finding. "
                 "Return your findings as JSON: "
                 "{ summary, approved, findings: [{ severity, file, line, message, suggestion }] }"
             )
         },
-        "tools": [fetch_diff, post_review_comment],
+        "tools": [fetch_diff, fetch_pr_context, post_review_comment, submit_review],
     })
 
     def handle_event(event) -> None:
@@ -153,14 +307,15 @@ async def main() -> None:
 
     session.on(handle_event)
 
-    await session.send_and_wait({
-        "prompt": (
-            f"Review PR #{PR_NUMBER} in {OWNER}/{REPO}. "
-            "Fetch the diff and return a structured review."
-        )
-    })
-
-    await client.stop()
+    try:
+        await session.send_and_wait({
+            "prompt": (
+                f"Review PR #{PR_NUMBER} in {OWNER}/{REPO}. "
+                "Fetch the PR context and return a structured review."
+            )
+        })
+    finally:
+        await client.stop()
 
 
 asyncio.run(main())
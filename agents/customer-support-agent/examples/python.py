@@ -3,12 +3,22 @@ Customer Support Agent — Python example
 
 Usage:
     KB_API_URL=https://your-kb.example.com uv run python python.py
+    # Optional semantic cache for knowledge base searches:
+    SEMANTIC_CACHE=1 uv run --with faiss-cpu --with sentence-transformers python python.py
 """
 import asyncio
+import importlib.util
+import json
+import os
+import sqlite3
 import sys
+import threading
+import time
 import uuid
-from typing import Optional
+from collections import OrderedDict
+from typing import Any, Callable, Optional
 
+import httpx
 from pydantic import BaseModel, Field
 
 from copilot import CopilotClient
@@ -16,11 +26,177 @@ from copilot.generated.session_events import SessionEventType
 from copilot.tools import define_tool
 
 
+# ---------------------------------------------------------------------------
+# Shared HTTP client
+# ---------------------------------------------------------------------------
+
+# Created once in main() and reused by every tool call so repeated knowledge
+# base requests keep their TCP/TLS connections alive.
+_HTTP: httpx.AsyncClient | None = None
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """Build the shared client; HTTP/2 is enabled when the optional h2 package is installed."""
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=httpx.Timeout(30.0),
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Semantic cache for knowledge base searches (opt-in via SEMANTIC_CACHE=1)
+# ---------------------------------------------------------------------------
+
+_SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE") == "1"
+
+if _SEMANTIC_CACHE_ENABLED:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+
+_EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+_EMBED_DIM = 384
+_EMBED: "SentenceTransformer | None" = None
+_EMBED_LOCK = threading.Lock()
+
+
+def _load_embedder() -> "SentenceTransformer":
+    """Return the shared embedding model, loading it on first use."""
+    global _EMBED
+    with _EMBED_LOCK:
+        if _EMBED is None:
+            _EMBED = SentenceTransformer(_EMBED_MODEL_NAME)
+        return _EMBED
+
+
+async def _run_abandonable(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run blocking *fn* on a daemon thread and await its result.
+
+    Used instead of asyncio.to_thread for anything that can wait on the model
+    load: a download cannot be interrupted, and asyncio.run() waits for
+    default-executor threads on shutdown, so quitting mid-download would hang.
+    Cancelling the await abandons the thread instead.
+    """
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def settle(result: Any, exc: Optional[BaseException]) -> None:
+        if done.done():  # cancelled while fn was running
+            return
+        if exc is None:
+            done.set_result(result)
+        else:
+            done.set_exception(exc)
+
+    def run() -> None:
+        result, exc = None, None
+        try:
+            result = fn(*args)
+        except Exception as e:
+            exc = e
+        try:
+            loop.call_soon_threadsafe(settle, result, exc)
+        except RuntimeError:  # the event loop has already closed
+            pass
+
+    threading.Thread(target=run, name=f"abandonable-{fn.__name__}", daemon=True).start()
+    return await done
+
+
+def _warm_up() -> None:
+    _load_embedder().encode(["warm up"], normalize_embeddings=True)
+
+
+async def _warm_embeddings() -> None:
+    """Load the embedding model and run one encode in the background.
+
+    Started right after the client starts so the first customer question does
+    not wait for the model load; _load_embedder makes repeated calls free.
+    """
+    await _run_abandonable(_warm_up)
+
+
+class _SemanticCache:
+    """Reuse a knowledge base result when a new query is semantically close to a cached one.
+
+    Embeddings are searched in an in-memory FAISS inner-product index and persisted,
+    with their results, to SQLite so the cache survives restarts. The least recently
+    used entries are evicted once *max_entries* is exceeded. Methods block, so call
+    them off the event loop: embed via _run_abandonable, since it waits for the
+    model load, and the rest via asyncio.to_thread.
+    """
+
+    def __init__(self, db_path: str, threshold: float = 0.85, max_entries: int = 5000) -> None:
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS kb_cache ("
+            "id INTEGER PRIMARY KEY, embedding BLOB NOT NULL, "
+            "result TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._index = faiss.IndexIDMap(faiss.IndexFlatIP(_EMBED_DIM))
+        rows = self._db.execute("SELECT id, embedding FROM kb_cache").fetchall()
+        if rows:
+            self._index.add_with_ids(
+                np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]),
+                np.array([row_id for row_id, _ in rows], dtype=np.int64),
+            )
+
+    def embed(self, text: str) -> "np.ndarray":
+        # Normalized vectors make the inner product equal to cosine similarity.
+        return _load_embedder().encode([text], normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, embedding: "np.ndarray") -> dict | None:
+        with self._lock:
+            if self._index.ntotal == 0:
+                return None
+            scores, ids = self._index.search(embedding, 1)
+            if scores[0][0] < self._threshold:
+                return None
+            row_id = int(ids[0][0])
+            row = self._db.execute("SELECT result FROM kb_cache WHERE id = ?", (row_id,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE kb_cache SET last_used = ? WHERE id = ?", (time.time(), row_id))
+            self._db.commit()
+            return json.loads(row[0])
+
+    def store(self, embedding: "np.ndarray", result: dict) -> None:
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO kb_cache (embedding, result, last_used) VALUES (?, ?, ?)",
+                (embedding.tobytes(), json.dumps(result), time.time()),
+            )
+            self._index.add_with_ids(embedding, np.array([cursor.lastrowid], dtype=np.int64))
+            overflow = self._index.ntotal - self._max_entries
+            if overflow > 0:
+                stale = [
+                    row_id
+                    for (row_id,) in self._db.execute(
+                        "SELECT id FROM kb_cache ORDER BY last_used LIMIT ?", (overflow,)
+                    )
+                ]
+                self._db.executemany("DELETE FROM kb_cache WHERE id = ?", [(i,) for i in stale])
+                self._index.remove_ids(np.array(stale, dtype=np.int64))
+            self._db.commit()
+
+
+_KB_CACHE: _SemanticCache | None = None
+
+
 # ---------------------------------------------------------------------------
 # Tool definitions — replace with your actual API implementations
 # ---------------------------------------------------------------------------
 
 
+# Read once at import: set KB_API_URL before starting the agent.
+_KB_URL = os.environ.get("KB_API_URL")
+_KB_SEARCH_URL = f"{_KB_URL}/search" if _KB_URL else None
+
+
 class SearchKBParams(BaseModel):
     query: str = Field(description="Natural language search query")
 
@@ -45,15 +221,18 @@ class EscalateParams(BaseModel):
 
 @define_tool(description="Search the product knowledge base for answers to customer questions")
 async def search_knowledge_base(params: SearchKBParams) -> dict:
-    import os
-
-    kb_url = os.environ.get("KB_API_URL")
-    if kb_url:
-        import httpx
-
-        async with httpx.AsyncClient() as http:
-            response = await http.get(f"{kb_url}/search", params={"q": params.query})
-        return response.json()
+    if _KB_URL:
+        embedding = None
+        if _KB_CACHE is not None:
+            embedding = await _run_abandonable(_KB_CACHE.embed, params.query)
+            cached = await asyncio.to_thread(_KB_CACHE.lookup, embedding)
+            if cached is not None:
+                return cached
+        response = await _HTTP.get(_KB_SEARCH_URL, params={"q": params.query})
+        result = response.json()
+        if embedding is not None and response.is_success:
+            await asyncio.to_thread(_KB_CACHE.store, embedding, result)
+        return result
     # Simulated response for demonstration
     return {
         "results": [
@@ -67,14 +246,20 @@ async def search_knowledge_base(params: SearchKBParams) -> dict:
     }
 
 
-@define_tool(description="Look up customer account information by email address")
-async def lookup_account(params: LookupAccountParams) -> dict:
+# The model often looks up the same customer several times in one conversation,
+# so account lookups are cached per email (LRU, entries expire after the TTL).
+_ACCOUNT_CACHE: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_ACCOUNT_CACHE_TTL = 60.0
+_ACCOUNT_CACHE_MAX = 500
+
+
+async def _fetch_account(email: str) -> dict:
     # Replace with your CRM/database query
     return {
         "found": True,
         "customer_id": "cust_12345",
         "name": "Jane Smith",
-        "email": params.email,
+        "email": email,
         "plan": "Pro",
         "account_status": "active",
         "open_tickets": 0,
@@ -82,9 +267,31 @@ async def lookup_account(params: LookupAccountParams) -> dict:
     }
 
 
+@define_tool(description="Look up customer account information by email address")
+async def lookup_account(params: LookupAccountParams) -> dict:
+    # Fetch with the normalized address too, so the cached result never echoes
+    # the casing of whichever lookup happened to populate it.
+    key = params.email.strip().lower()
+    now = time.monotonic()
+    cached = _ACCOUNT_CACHE.get(key)
+    if cached is not None and now - cached[0] < _ACCOUNT_CACHE_TTL:
+        _ACCOUNT_CACHE.move_to_end(key)
+        return cached[1]
+
+    account = await _fetch_account(key)
+    _ACCOUNT_CACHE[key] = (now, account)
+    _ACCOUNT_CACHE.move_to_end(key)
+    if len(_ACCOUNT_CACHE) > _ACCOUNT_CACHE_MAX:
+        _ACCOUNT_CACHE.popitem(last=False)
+    return account
+
+
+_TICKET_PREFIX = "TKT-"
+
+
 @define_tool(description="Create a support ticket for issues requiring follow-up")
 async def create_ticket(params: CreateTicketParams) -> dict:
-    ticket_id = f"TKT-{uuid.uuid4()}"
+    ticket_id = _TICKET_PREFIX + uuid.uuid4().hex
     print(
         f"\n[Ticket Created] {ticket_id}: {params.title} ({params.priority}) "
         f"for {params.customer_email}",
@@ -111,14 +318,102 @@ async def escalate_to_human(params: EscalateParams) -> dict:
     }
 
 
+# ---------------------------------------------------------------------------
+# Streaming output
+# ---------------------------------------------------------------------------
+
+
+class _StdoutBuffer:
+    """Coalesce streamed deltas so stdout is flushed every 25 ms or 8 KB, not per token."""
+
+    def __init__(self, flush_interval: float = 0.025, max_size: int = 8192) -> None:
+        self._flush_interval = flush_interval
+        self._max_size = max_size
+        self._parts: list[str] = []
+        self._size = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._flush_interval, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._parts:
+            sys.stdout.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+        sys.stdout.flush()
+
+
+_STDOUT = _StdoutBuffer()
+
+
+def _on_delta(event, _write=_STDOUT.write) -> None:
+    _write(event.data.delta_content)
+
+
+def _on_idle(event) -> None:
+    _STDOUT.write("\n\n")
+    _STDOUT.flush()
+
+
+def _on_error(event) -> None:
+    # send_and_wait raises on session.error; emit what streamed before it.
+    _STDOUT.flush()
+
+
+def _ignore_event(event) -> None:
+    pass
+
+
+# Session event type -> handler; one dict lookup per streamed event.
+_EVENT_HANDLERS = {
+    SessionEventType.ASSISTANT_MESSAGE_DELTA: _on_delta,
+    SessionEventType.SESSION_IDLE: _on_idle,
+    SessionEventType.SESSION_ERROR: _on_error,
+}
+
+
+def handle_event(event, _dispatch=_EVENT_HANDLERS.get, _default=_ignore_event) -> None:
+    # Hot path for every streamed delta: the lookups are bound as default
+    # arguments so they are local-variable loads rather than global lookups.
+    _dispatch(event.type, _default)(event)
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
 
 async def main() -> None:
+    global _HTTP
+    _HTTP = _create_http_client()
+    # Closed in its own finally so it is released even when the client fails to
+    # start or stop.
+    try:
+        await _chat()
+    finally:
+        await _HTTP.aclose()
+
+
+async def _chat() -> None:
+    global _KB_CACHE
+    if _SEMANTIC_CACHE_ENABLED:
+        _KB_CACHE = _SemanticCache(os.environ.get("SEMANTIC_CACHE_PATH", "kb_semantic_cache.sqlite3"))
+
+    # Output is flushed explicitly (see _StdoutBuffer), so skip per-line flushing.
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
+
     client = CopilotClient()
     await client.start()
+    warm_task = asyncio.create_task(_warm_embeddings()) if _KB_CACHE is not None else None
 
     session = await client.create_session({
         "model": "gpt-4.1",
@@ -135,33 +430,41 @@ async def main() -> None:
         "tools": [search_knowledge_base, lookup_account, create_ticket, escalate_to_human],
     })
 
-    def handle_event(event) -> None:
-        if event.type == SessionEventType.ASSISTANT_MESSAGE_DELTA:
-            sys.stdout.write(event.data.delta_content)
-            sys.stdout.flush()
-        if event.type == SessionEventType.SESSION_IDLE:
-            sys.stdout.write("\n\n")
-            sys.stdout.flush()
-
     session.on(handle_event)
 
     print("💬 Customer Support Agent (type 'exit' to quit)\n")
 
-    while True:
-        try:
-            user_input = input("Customer: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            break
-        if user_input.lower() == "exit":
-            break
-        if not user_input:
-            continue
-        sys.stdout.write("Agent: ")
-        sys.stdout.flush()
-        await session.send_and_wait({"prompt": user_input})
-
-    await client.stop()
+    try:
+        while True:
+            try:
+                user_input = input("Customer: ").strip()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if user_input.lower() == "exit":
+                break
+            if not user_input:
+                continue
+            sys.stdout.write("Agent: ")
+            sys.stdout.flush()
+            await session.send_and_wait({"prompt": user_input})
+    finally:
+        # Emit output still buffered when send_and_wait raised or Ctrl-C cancelled it.
+        _STDOUT.flush()
+        if warm_task is not None:
+            warm_task.cancel()
+            try:
+                await warm_task
+            except asyncio.CancelledError:
+                pass
+            except Exception as exc:
+                print(f"Semantic cache warm-up failed: {exc}", file=sys.stderr)
+        await client.stop()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop  # optional, faster event loop on Linux/macOS
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -81,13 +81,10 @@ const loadCsv = defineTool("load_csv", {
             const content = readFileSync(resolvedPath, "utf-8");
             const lines = content.split("\n").filter(Boolean);
             const headers = lines[0]?.split(",") ?? [];
-            const data = lines.slice(1, rows + 1).map((line) => {
-                const values = line.split(",");
-                return Object.fromEntries(headers.map((h, i) => [h.trim(), values[i]?.trim()]));
-            });
+            const data = lines.slice(1, rows + 1).map((line) => line.split(",").map((v) => v.trim()));
             return {
                 columns: headers,
-                preview: data,
+                rows: data,
                 total_rows: lines.length - 1,
             };
         } catch (err: unknown) {
@@ -7,12 +7,26 @@ Usage:
     uv run python python.py
 """
 import asyncio
+import csv
+import itertools
 import math
 import os
+import os.path as osp
 import sys
+from pathlib import Path
 
 from pydantic import BaseModel, Field
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; compute_stats falls back to pure Python
+    np = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; large results are then serialized by the SDK
+    orjson = None
+
 from copilot import CopilotClient
 from copilot.generated.session_events import SessionEventType
 from copilot.tools import define_tool
@@ -31,11 +45,13 @@ class RunSqlParams(BaseModel):
 @define_tool(description="Execute a read-only SQL query and return results")
 async def run_sql_query(params: RunSqlParams) -> dict:
     # Validate read-only: only SELECT/WITH allowed; block semicolons to prevent stacked queries
-    normalized = params.sql.strip().upper()
-    if not (normalized.startswith("SELECT") or normalized.startswith("WITH")):
+    # Only the leading keyword is upper-cased, not a copy of the whole query.
+    head = params.sql.lstrip()[:6].upper()
+    if not head.startswith(("SELECT", "WITH")):
         return {"error": "Only SELECT queries are permitted"}
-    if ";" in params.sql:
-        return {"error": "Semicolons are not permitted in queries"}
+    semicolon = params.sql.find(";")
+    if semicolon != -1:
+        return {"error": f"Semicolons are not permitted in queries (found at position {semicolon})"}
 
     db_url = os.environ.get("DATABASE_URL")
     if not db_url:
@@ -64,11 +80,46 @@ class LoadCsvParams(BaseModel):
     rows: int = Field(default=50, description="Number of rows to return")
 
 
-@define_tool(description="Load a CSV file from the data directory and return its contents for analysis")
-async def load_csv(params: LoadCsvParams) -> dict:
-    import csv
-    import os.path as osp
+def _json_result(payload: dict) -> dict | str:
+    """Serialize *payload* with orjson if installed; the SDK forwards str results verbatim."""
+    if orjson is None:
+        return payload
+    return orjson.dumps(payload).decode()
+
+
+# Resolved once at import; every load_csv call is checked against it.
+DATA_DIR = Path(os.environ.get("DATA_DIR", os.getcwd())).resolve()
+
+# Files at least this large have their rows counted with a byte-level newline
+# scan instead of parsing every remaining row through the csv module.
+_FAST_COUNT_MIN_BYTES = 1 << 20
 
+
+def _count_csv_data_rows(path: Path) -> int:
+    """Count data rows (excluding the header) by scanning raw bytes for newlines.
+
+    Lines end in ``\n`` (LF or CRLF); a file without any ``\n`` is counted by
+    ``\r`` instead, as written by classic Mac OS tools. Blank lines and quoted
+    fields containing embedded newlines are counted as extra rows, so the
+    result is an upper bound; load_csv reports it with ``total_rows_exact``
+    set to false.
+    """
+    lf = cr = 0
+    last = b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_FAST_COUNT_MIN_BYTES), b""):
+            lf += chunk.count(b"\n")
+            if not lf:
+                cr += chunk.count(b"\r")
+            last = chunk
+    lines, eol = (lf, b"\n") if lf else (cr, b"\r")
+    if last and not last.endswith(eol):
+        lines += 1
+    return max(lines - 1, 0)
+
+
+@define_tool(description="Load a CSV file from the data directory and return its contents for analysis")
+async def load_csv(params: LoadCsvParams) -> dict | str:
     file_path = params.file_path
 
     # Reject absolute paths and path traversal attempts
@@ -77,24 +128,25 @@ async def load_csv(params: LoadCsvParams) -> dict:
     if not file_path.lower().endswith(".csv"):
         return {"error": "Only .csv files are supported."}
 
-    data_dir = os.environ.get("DATA_DIR", os.getcwd())
-    data_dir = osp.realpath(data_dir)
-    resolved_path = osp.realpath(osp.join(data_dir, file_path))
-
-    if not resolved_path.startswith(data_dir + osp.sep) and resolved_path != data_dir:
+    resolved_path = (DATA_DIR / file_path).resolve()
+    if not resolved_path.is_relative_to(DATA_DIR):
         return {"error": "Access outside of the data directory is not allowed."}
 
     try:
         with open(resolved_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            headers = reader.fieldnames or []
-            data = []
-            total = 0
-            for row in reader:
-                total += 1
-                if total <= params.rows:
-                    data.append(dict(row))
-        return {"columns": list(headers), "preview": data, "total_rows": total}
+            # Plain csv.reader rows (lists) avoid building a dict per row; blank
+            # lines are skipped, as csv.DictReader would.
+            reader = filter(None, csv.reader(f))
+            headers = next(reader, [])
+            rows = list(itertools.islice(reader, max(params.rows, 0)))
+            exact = resolved_path.stat().st_size < _FAST_COUNT_MIN_BYTES
+            if exact:
+                total = len(rows) + sum(1 for _ in reader)
+            else:
+                total = _count_csv_data_rows(resolved_path)
+        return _json_result(
+            {"columns": headers, "rows": rows, "total_rows": total, "total_rows_exact": exact}
+        )
     except OSError as exc:
         return {"error": str(exc)}
 
@@ -114,17 +166,41 @@ async def compute_stats(params: ComputeStatsParams) -> dict:
     values = params.data
     if not values:
         return {"error": "Empty array"}
-    sorted_vals = sorted(values)
-    n = len(sorted_vals)
-    total = sum(sorted_vals)
-    mean = total / n
-    variance = sum((x - mean) ** 2 for x in sorted_vals) / n
+    # NaN and infinity have no meaningful mean, spread or ordering; reject them
+    # on both paths.
+    if not all(map(math.isfinite, values)):
+        return {"error": "Data contains non-finite values (NaN or infinity)"}
+    n = len(values)
     mid = n // 2
+    p25_idx = int(n * 0.25)
+    p75_idx = int(n * 0.75)
+
+    if np is not None:
+        # Vectorized path: the reductions run in C, and np.partition places the
+        # required order statistics in O(n) instead of fully sorting the data.
+        arr = np.asarray(values, dtype=np.float64)
+        ranked = np.partition(arr, sorted({p25_idx, max(mid - 1, 0), mid, p75_idx}))
+        median = (ranked[mid - 1] + ranked[mid]) / 2 if n % 2 == 0 else ranked[mid]
+        return {
+            "column": params.column_name,
+            "count": n,
+            "min": arr.min().item(),
+            "max": arr.max().item(),
+            "mean": round(arr.mean().item(), 2),
+            "median": round(median.item(), 2),
+            "std_dev": round(arr.std().item(), 2),
+            "p25": ranked[p25_idx].item(),
+            "p75": ranked[p75_idx].item(),
+        }
+
+    # Pure-Python fallback: sum() runs in C, so two passes beat a bytecode-level
+    # single-pass (Welford) loop, and one sort yields min, max and every quantile.
+    mean = sum(values) / n
+    variance = sum((x - mean) ** 2 for x in values) / n
+    sorted_vals = sorted(values)
     median = (
         (sorted_vals[mid - 1] + sorted_vals[mid]) / 2 if n % 2 == 0 else sorted_vals[mid]
     )
-    p25 = sorted_vals[int(n * 0.25)]
-    p75 = sorted_vals[int(n * 0.75)]
     return {
         "column": params.column_name,
         "count": n,
@@ -133,17 +209,89 @@ async def compute_stats(params: ComputeStatsParams) -> dict:
         "mean": round(mean, 2),
         "median": round(median, 2),
         "std_dev": round(math.sqrt(variance), 2),
-        "p25": p25,
-        "p75": p75,
+        "p25": sorted_vals[p25_idx],
+        "p75": sorted_vals[p75_idx],
     }
 
 
+# ---------------------------------------------------------------------------
+# Streaming output
+# ---------------------------------------------------------------------------
+
+
+class _StdoutBuffer:
+    """Coalesce streamed deltas so stdout is flushed every 25 ms or 8 KB, not per token."""
+
+    def __init__(self, flush_interval: float = 0.025, max_size: int = 8192) -> None:
+        self._flush_interval = flush_interval
+        self._max_size = max_size
+        self._parts: list[str] = []
+        self._size = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._flush_interval, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._parts:
+            sys.stdout.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+        sys.stdout.flush()
+
+
+_STDOUT = _StdoutBuffer()
+
+
+def _on_delta(event, _write=_STDOUT.write) -> None:
+    _write(event.data.delta_content)
+
+
+def _on_idle(event) -> None:
+    _STDOUT.write("\n\n")
+    _STDOUT.flush()
+
+
+def _on_error(event) -> None:
+    # send_and_wait raises on session.error; emit what streamed before it.
+    _STDOUT.flush()
+
+
+def _ignore_event(event) -> None:
+    pass
+
+
+# Session event type -> handler; one dict lookup per streamed event.
+_EVENT_HANDLERS = {
+    SessionEventType.ASSISTANT_MESSAGE_DELTA: _on_delta,
+    SessionEventType.SESSION_IDLE: _on_idle,
+    SessionEventType.SESSION_ERROR: _on_error,
+}
+
+
+def handle_event(event, _dispatch=_EVENT_HANDLERS.get, _default=_ignore_event) -> None:
+    # Hot path for every streamed delta: the lookups are bound as default
+    # arguments so they are local-variable loads rather than global lookups.
+    _dispatch(event.type, _default)(event)
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
 
 async def main() -> None:
+    # Output is flushed explicitly (see _StdoutBuffer), so skip per-line flushing.
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
+
     client = CopilotClient()
     await client.start()
 
@@ -162,34 +310,34 @@ async def main() -> None:
         "tools": [run_sql_query, load_csv, compute_stats],
     })
 
-    def handle_event(event) -> None:
-        if event.type == SessionEventType.ASSISTANT_MESSAGE_DELTA:
-            sys.stdout.write(event.data.delta_content)
-            sys.stdout.flush()
-        if event.type == SessionEventType.SESSION_IDLE:
-            sys.stdout.write("\n\n")
-            sys.stdout.flush()
-
     session.on(handle_event)
 
     print("📊 Data Analyst Agent (type 'exit' to quit)\n")
     print("   Try: 'What were our top 5 products last month?'\n")
 
-    while True:
-        try:
-            user_input = input("Analyst: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            break
-        if user_input.lower() == "exit":
-            break
-        if not user_input:
-            continue
-        sys.stdout.write("Agent: ")
-        sys.stdout.flush()
-        await session.send_and_wait({"prompt": user_input})
-
-    await client.stop()
+    try:
+        while True:
+            try:
+                user_input = input("Analyst: ").strip()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if user_input.lower() == "exit":
+                break
+            if not user_input:
+                continue
+            sys.stdout.write("Agent: ")
+            sys.stdout.flush()
+            await session.send_and_wait({"prompt": user_input})
+    finally:
+        # Emit output still buffered when send_and_wait raised or Ctrl-C cancelled it.
+        _STDOUT.flush()
+        await client.stop()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop  # optional, faster event loop on Linux/macOS
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -6,12 +6,20 @@ Usage:
     # Works without a cluster — kubectl errors are surfaced as tool results
 """
 import asyncio
+import json
 import re
-import subprocess
 import sys
+from operator import itemgetter
 
 from pydantic import BaseModel, Field
 
+try:
+    # orjson parses and serializes large kubectl JSON payloads several times
+    # faster than the stdlib; it is optional.
+    import orjson
+except ImportError:
+    orjson = None
+
 from copilot import CopilotClient
 from copilot.generated.session_events import SessionEventType
 from copilot.tools import define_tool
@@ -21,20 +29,65 @@ from copilot.tools import define_tool
 # ---------------------------------------------------------------------------
 
 # Kubernetes name pattern: lowercase alphanumeric and hyphens only
-_K8S_NAME = re.compile(r"^[a-z0-9]([a-z0-9-]*[a-z0-9])?$")
-# Duration pattern for --since flag: e.g. 1h, 30m, 2h
-_DURATION = re.compile(r"^[0-9]+(h|m|s)$")
+_K8S_NAME = re.compile(r"[a-z0-9](?:[a-z0-9-]*[a-z0-9])?")
+
+# Bound fullmatch method: the whole value must match (a trailing newline is
+# rejected, unlike match() with a "$" anchor) and the attribute lookup is done once.
+_K8S_NAME_OK = _K8S_NAME.fullmatch
+# Units accepted by the --since flag, e.g. 1h, 30m, 90s
+_DURATION_UNITS = frozenset("hms")
 
-_ALLOWED_KUBECTL = {"get", "describe", "logs", "top", "rollout"}
+_ALLOWED_KUBECTL = frozenset({"get", "describe", "logs", "top", "rollout"})
+_ALLOWED_KUBECTL_DISPLAY = ", ".join(sorted(_ALLOWED_KUBECTL))
+# An allowed subcommand as the first whitespace-separated token, built from the allowlist.
+_KUBECTL_SUBCOMMAND = re.compile(
+    rf"\s*(?:{'|'.join(map(re.escape, sorted(_ALLOWED_KUBECTL)))})(?:\s|\Z)"
+)
 
 
 def _validate_k8s_name(value: str, label: str) -> str | None:
     """Return an error string if *value* is not a valid Kubernetes name."""
-    if not _K8S_NAME.match(value):
+    if _K8S_NAME_OK(value) is None:
         return f"Invalid {label}. Use lowercase alphanumeric characters and hyphens only."
     return None
 
 
+def _is_duration(value: str) -> bool:
+    """Return True for ``<digits><h|m|s>`` durations, checked without a regex."""
+    digits = value[:-1]
+    # isascii() keeps isdigit() from accepting non-ASCII digits such as "\u0663".
+    return bool(digits) and value[-1] in _DURATION_UNITS and digits.isascii() and digits.isdigit()
+
+
+# ---------------------------------------------------------------------------
+# kubectl process helper
+# ---------------------------------------------------------------------------
+
+_KUBECTL_TIMEOUT = 30
+
+
+async def _exec_kubectl(*args: str) -> tuple[int, bytes, bytes]:
+    """Run kubectl without blocking the event loop, killing it if it exceeds the timeout."""
+    proc = await asyncio.create_subprocess_exec(
+        "kubectl",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=_KUBECTL_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode, stdout, stderr
+
+
+def _decode(output: bytes) -> str:
+    """Decode kubectl output only where a tool returns it as text, tolerating invalid UTF-8."""
+    return output.decode("utf-8", errors="replace")
+
+
 # ---------------------------------------------------------------------------
 # Tool: run read-only kubectl commands
 # ---------------------------------------------------------------------------
@@ -46,30 +99,23 @@ class KubectlParams(BaseModel):
 
 @define_tool(description="Execute a read-only kubectl command to inspect cluster state")
 async def run_kubectl(params: KubectlParams) -> dict:
-    args = params.command.strip().split()
-    if not args:
-        return {"error": "No command provided"}
-    subcommand = args[0]
-    if subcommand not in _ALLOWED_KUBECTL:
+    if _KUBECTL_SUBCOMMAND.match(params.command) is None:
+        if not params.command.strip():
+            return {"error": "No command provided"}
         return {
             "error": (
                 f"Only read-only kubectl commands are permitted. "
-                f"Allowed: {', '.join(sorted(_ALLOWED_KUBECTL))}"
+                f"Allowed: {_ALLOWED_KUBECTL_DISPLAY}"
             )
         }
+    args = params.command.split()
     try:
-        result = await asyncio.to_thread(
-            subprocess.run,
-            ["kubectl", *args],
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        return {"output": result.stdout, "stderr": result.stderr}
+        _, stdout, stderr = await _exec_kubectl(*args)
+        return {"output": _decode(stdout), "stderr": _decode(stderr)}
     except FileNotFoundError:
         return {"error": "kubectl not found. Install kubectl and ensure it is in your PATH."}
-    except subprocess.TimeoutExpired:
-        return {"error": "kubectl command timed out after 30 seconds."}
+    except asyncio.TimeoutError:
+        return {"error": f"kubectl command timed out after {_KUBECTL_TIMEOUT} seconds."}
 
 
 # ---------------------------------------------------------------------------
@@ -92,26 +138,20 @@ async def fetch_logs(params: FetchLogsParams) -> dict:
     err = _validate_k8s_name(params.namespace, "namespace")
     if err:
         return {"error": err}
-    if not _DURATION.match(params.since):
+    if not _is_duration(params.since):
         return {"error": "Invalid duration format. Use a value like 1h, 30m, or 2h."}
     safe_lines = max(1, min(1000, params.lines))
     try:
-        result = await asyncio.to_thread(
-            subprocess.run,
-            [
-                "kubectl", "logs", "-l", f"app={params.service}",
-                "-n", params.namespace,
-                f"--tail={safe_lines}",
-                f"--since={params.since}",
-            ],
-            capture_output=True,
-            text=True,
-            timeout=30,
+        _, stdout, stderr = await _exec_kubectl(
+            "logs", "-l", f"app={params.service}",
+            "-n", params.namespace,
+            f"--tail={safe_lines}",
+            f"--since={params.since}",
         )
-        return {"logs": result.stdout, "stderr": result.stderr}
+        return {"logs": _decode(stdout), "stderr": _decode(stderr)}
     except FileNotFoundError:
         return {"error": "kubectl not found. Install kubectl and ensure it is in your PATH."}
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         return {"error": "kubectl command timed out."}
 
 
@@ -124,52 +164,135 @@ class ListDeploymentsParams(BaseModel):
     namespace: str = Field(default="production")
 
 
-@define_tool(description="List recent deployment events in a namespace")
-async def list_recent_deployments(params: ListDeploymentsParams) -> dict:
-    import json
+_json_loads = orjson.loads if orjson is not None else json.loads
+_name_and_timestamp = itemgetter("name", "creationTimestamp")
+
+
+def _json_result(payload: dict) -> dict | str:
+    """Pre-serialize a large tool result with orjson when available.
+
+    The SDK passes string results through unchanged, so this skips its
+    json.dumps pass; without orjson the dict is returned as-is.
+    """
+    if orjson is None:
+        return payload
+    return orjson.dumps(payload).decode()
+
+
+def _summarize_deployment(d: dict) -> dict:
+    """Flatten one item of `kubectl get deployments -o json` into the tool's summary shape."""
+    name, timestamp = _name_and_timestamp(d["metadata"])
+    containers = d["spec"]["template"]["spec"]["containers"]
+    status = d["status"]
+    return {
+        "name": name,
+        "image": containers[0].get("image", "unknown") if containers else "unknown",
+        "timestamp": timestamp,
+        "ready": f"{status.get('readyReplicas', 0)}/{status.get('replicas', 0)}",
+    }
 
+
+@define_tool(description="List recent deployment events in a namespace")
+async def list_recent_deployments(params: ListDeploymentsParams) -> dict | str:
     err = _validate_k8s_name(params.namespace, "namespace")
     if err:
         return {"error": err}
     try:
-        result = await asyncio.to_thread(
-            subprocess.run,
-            ["kubectl", "get", "deployments", "-n", params.namespace, "-o", "json"],
-            capture_output=True,
-            text=True,
-            timeout=30,
+        returncode, stdout, stderr = await _exec_kubectl(
+            "get", "deployments", "-n", params.namespace, "-o", "json"
+        )
+        if returncode != 0:
+            return {"error": _decode(stderr) or "kubectl returned non-zero exit code"}
+        data = _json_loads(stdout)
+        return _json_result(
+            {"deployments": [_summarize_deployment(d) for d in data.get("items", [])]}
         )
-        if result.returncode != 0:
-            return {"error": result.stderr or "kubectl returned non-zero exit code"}
-        data = json.loads(result.stdout)
-        deployments = [
-            {
-                "name": d["metadata"]["name"],
-                "image": (
-                    d["spec"]["template"]["spec"]["containers"][0].get("image", "unknown")
-                    if d["spec"]["template"]["spec"]["containers"]
-                    else "unknown"
-                ),
-                "timestamp": d["metadata"]["creationTimestamp"],
-                "ready": (
-                    f"{d['status'].get('readyReplicas', 0)}/{d['status'].get('replicas', 0)}"
-                ),
-            }
-            for d in data.get("items", [])
-        ]
-        return {"deployments": deployments}
     except FileNotFoundError:
         return {"error": "kubectl not found. Install kubectl and ensure it is in your PATH."}
-    except (subprocess.TimeoutExpired, json.JSONDecodeError, KeyError) as exc:
+    except asyncio.TimeoutError:
+        return {"error": "kubectl command timed out."}
+    except (json.JSONDecodeError, KeyError) as exc:
         return {"error": str(exc)}
 
 
+# ---------------------------------------------------------------------------
+# Streaming output
+# ---------------------------------------------------------------------------
+
+
+class _StdoutBuffer:
+    """Coalesce streamed deltas so stdout is flushed every 25 ms or 8 KB, not per token."""
+
+    def __init__(self, flush_interval: float = 0.025, max_size: int = 8192) -> None:
+        self._flush_interval = flush_interval
+        self._max_size = max_size
+        self._parts: list[str] = []
+        self._size = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._flush_interval, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._parts:
+            sys.stdout.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+        sys.stdout.flush()
+
+
+_STDOUT = _StdoutBuffer()
+
+
+def _on_delta(event, _write=_STDOUT.write) -> None:
+    _write(event.data.delta_content)
+
+
+def _on_idle(event) -> None:
+    _STDOUT.write("\n\n")
+    _STDOUT.flush()
+
+
+def _on_error(event) -> None:
+    # send_and_wait raises on session.error; emit what streamed before it.
+    _STDOUT.flush()
+
+
+def _ignore_event(event) -> None:
+    pass
+
+
+# Session event type -> handler; one dict lookup per streamed event.
+_EVENT_HANDLERS = {
+    SessionEventType.ASSISTANT_MESSAGE_DELTA: _on_delta,
+    SessionEventType.SESSION_IDLE: _on_idle,
+    SessionEventType.SESSION_ERROR: _on_error,
+}
+
+
+def handle_event(event, _dispatch=_EVENT_HANDLERS.get, _default=_ignore_event) -> None:
+    # Hot path for every streamed delta: the lookups are bound as default
+    # arguments so they are local-variable loads rather than global lookups.
+    _dispatch(event.type, _default)(event)
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
 
 async def main() -> None:
+    # Output is flushed explicitly (see _StdoutBuffer), so skip per-line flushing.
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
+
     client = CopilotClient()
     await client.start()
 
@@ -187,34 +310,34 @@ async def main() -> None:
         "tools": [run_kubectl, fetch_logs, list_recent_deployments],
     })
 
-    def handle_event(event) -> None:
-        if event.type == SessionEventType.ASSISTANT_MESSAGE_DELTA:
-            sys.stdout.write(event.data.delta_content)
-            sys.stdout.flush()
-        if event.type == SessionEventType.SESSION_IDLE:
-            sys.stdout.write("\n\n")
-            sys.stdout.flush()
-
     session.on(handle_event)
 
     print("🔧 DevOps Agent (type 'exit' to quit)\n")
     print("   Try: 'Check the health of api-gateway in production'\n")
 
-    while True:
-        try:
-            user_input = input("Engineer: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            break
-        if user_input.lower() == "exit":
-            break
-        if not user_input:
-            continue
-        sys.stdout.write("Agent: ")
-        sys.stdout.flush()
-        await session.send_and_wait({"prompt": user_input})
-
-    await client.stop()
+    try:
+        while True:
+            try:
+                user_input = input("Engineer: ").strip()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if user_input.lower() == "exit":
+                break
+            if not user_input:
+                continue
+            sys.stdout.write("Agent: ")
+            sys.stdout.flush()
+            await session.send_and_wait({"prompt": user_input})
+    finally:
+        # Emit output still buffered when send_and_wait raised or Ctrl-C cancelled it.
+        _STDOUT.flush()
+        await client.stop()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop  # optional, faster event loop on Linux/macOS
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
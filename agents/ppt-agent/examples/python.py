@@ -745,6 +745,75 @@ async def save_presentation(params: SavePresentationParams) -> dict:
             return {"error": str(exc)}
 
 
+# ---------------------------------------------------------------------------
+# Streaming output
+# ---------------------------------------------------------------------------
+
+
+class _StdoutBuffer:
+    """Coalesce streamed deltas so stdout is flushed every 25 ms or 8 KB, not per token."""
+
+    def __init__(self, flush_interval: float = 0.025, max_size: int = 8192) -> None:
+        self._flush_interval = flush_interval
+        self._max_size = max_size
+        self._parts: list[str] = []
+        self._size = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._flush_interval, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._parts:
+            sys.stdout.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+        sys.stdout.flush()
+
+
+_STDOUT = _StdoutBuffer()
+
+
+def _on_delta(event, _write=_STDOUT.write) -> None:
+    _write(event.data.delta_content)
+
+
+def _on_idle(event) -> None:
+    _STDOUT.write("\n\n")
+    _STDOUT.flush()
+
+
+def _on_error(event) -> None:
+    # send_and_wait raises on session.error; emit what streamed before it.
+    _STDOUT.flush()
+
+
+def _ignore_event(event) -> None:
+    pass
+
+
+# Session event type -> handler; one dict lookup per streamed event.
+_EVENT_HANDLERS = {
+    SessionEventType.ASSISTANT_MESSAGE_DELTA: _on_delta,
+    SessionEventType.SESSION_IDLE: _on_idle,
+    SessionEventType.SESSION_ERROR: _on_error,
+}
+
+
+def handle_event(event, _dispatch=_EVENT_HANDLERS.get, _default=_ignore_event) -> None:
+    # Hot path for every streamed delta: the lookups are bound as default
+    # arguments so they are local-variable loads rather than global lookups.
+    _dispatch(event.type, _default)(event)
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -863,6 +932,9 @@ def _resolve_cli_path() -> tuple[Optional[str], Optional[str]]:
 
 
 async def main() -> None:
+    # Output is flushed explicitly (see _StdoutBuffer), so skip per-line flushing.
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
+
     cli_path, js_script = _resolve_cli_path()
     if cli_path is None:
         print(
@@ -899,14 +971,6 @@ async def main() -> None:
         "tools": _ALL_TOOLS,
     })
 
-    def handle_event(event) -> None:
-        if event.type == SessionEventType.ASSISTANT_MESSAGE_DELTA:
-            sys.stdout.write(event.data.delta_content)
-            sys.stdout.flush()
-        if event.type == SessionEventType.SESSION_IDLE:
-            sys.stdout.write("\n\n")
-            sys.stdout.flush()
-
     session.on(handle_event)
 
     output_dir = os.environ.get("PPTX_OUTPUT_DIR", os.getcwd())
@@ -915,21 +979,29 @@ async def main() -> None:
     print(f"   Output directory: {osp.abspath(output_dir)}")
     print("   Try: 'Create a 3-slide deck named demo.pptx with a title slide, agenda, and summary'\n")
 
-    while True:
-        try:
-            user_input = input("You: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            break
-        if user_input.lower() == "exit":
-            break
-        if not user_input:
-            continue
-        sys.stdout.write("Agent: ")
-        sys.stdout.flush()
-        await session.send_and_wait({"prompt": user_input})
-
-    await client.stop()
+    try:
+        while True:
+            try:
+                user_input = input("You: ").strip()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if user_input.lower() == "exit":
+                break
+            if not user_input:
+                continue
+            sys.stdout.write("Agent: ")
+            sys.stdout.flush()
+            await session.send_and_wait({"prompt": user_input})
+    finally:
+        # Emit output still buffered when send_and_wait raised or Ctrl-C cancelled it.
+        _STDOUT.flush()
+        await client.stop()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop  # optional, faster event loop on Linux/macOS
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -21,6 +21,7 @@ import sys
 import threading
 from dataclasses import asdict, is_dataclass
 from pathlib import Path
+from types import TracebackType
 from typing import Any, Callable, Optional, cast
 
 from .generated.rpc import ServerRpc
@@ -417,6 +418,48 @@ class CopilotClient:
         if not self._is_external_server:
             self._actual_port = None
 
+    async def __aenter__(self) -> "CopilotClient":
+        """
+        Start the client when entering an ``async with`` block.
+
+        Example:
+            >>> async with CopilotClient() as client:
+            ...     session = await client.create_session({
+            ...         "on_permission_request": PermissionHandler.approve_all,
+            ...     })
+            ...     await session.send_and_wait({"prompt": "Hello!"})
+        """
+        try:
+            await self.start()
+        except BaseException:
+            # __aexit__ does not run when __aenter__ raises, so clean up a CLI
+            # process that was spawned before the connection failed.
+            await self.force_stop()
+            raise
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        """
+        Stop the client when leaving an ``async with`` block.
+
+        On a normal exit the client is stopped gracefully with :meth:`stop`. If the
+        block raised, or graceful cleanup itself fails, :meth:`force_stop` is used
+        instead. Exceptions from the block are never suppressed.
+        """
+        if exc_type is not None:
+            await self.force_stop()
+            return
+        try:
+            await self.stop()
+        except BaseException:
+            await self.force_stop()
+            raise
+
     async def create_session(self, config: SessionConfig) -> CopilotSession:
         """
         Create a new conversation session with the Copilot CLI.
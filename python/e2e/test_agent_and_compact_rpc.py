@@ -1,176 +1,138 @@
 """E2E tests for Agent Selection and Session Compaction RPC APIs."""
 
 import pytest
+import pytest_asyncio
 
-from copilot import CopilotClient, PermissionHandler
+from copilot import CopilotClient, PermissionHandler, SessionConfig
 from copilot.generated.rpc import SessionAgentSelectParams
 
 from .testharness import CLI_PATH, E2ETestContext
 
 pytestmark = pytest.mark.asyncio(loop_scope="module")
 
+# Only ever read (serialized via to_dict), so one instance is shared by every test.
+_SELECT_TEST_AGENT = SessionAgentSelectParams(name="test-agent")
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def client():
+    """A single CLI client shared by the agent selection tests; each test uses its own session."""
+    async with CopilotClient({"cli_path": CLI_PATH, "use_stdio": True}) as c:
+        yield c
+
+
+@pytest.fixture(scope="module")
+def single_agent_config() -> SessionConfig:
+    """Session config with a single ``test-agent`` custom agent, built once per module."""
+    return {
+        "on_permission_request": PermissionHandler.approve_all,
+        "custom_agents": [
+            {
+                "name": "test-agent",
+                "display_name": "Test Agent",
+                "description": "A test agent",
+                "prompt": "You are a test agent.",
+            }
+        ],
+    }
+
 
 class TestAgentSelectionRpc:
     @pytest.mark.asyncio
-    async def test_should_list_available_custom_agents(self):
+    async def test_should_list_available_custom_agents(self, client: CopilotClient):
         """Test listing available custom agents via RPC."""
-        client = CopilotClient({"cli_path": CLI_PATH, "use_stdio": True})
-
-        try:
-            await client.start()
-            session = await client.create_session(
-                {
-                    "on_permission_request": PermissionHandler.approve_all,
-                    "custom_agents": [
-                        {
-                            "name": "test-agent",
-                            "display_name": "Test Agent",
-                            "description": "A test agent",
-                            "prompt": "You are a test agent.",
-                        },
-                        {
-                            "name": "another-agent",
-                            "display_name": "Another Agent",
-                            "description": "Another test agent",
-                            "prompt": "You are another agent.",
-                        },
-                    ],
-                }
-            )
-
-            result = await session.rpc.agent.list()
-            assert result.agents is not None
-            assert len(result.agents) == 2
-            assert result.agents[0].name == "test-agent"
-            assert result.agents[0].display_name == "Test Agent"
-            assert result.agents[0].description == "A test agent"
-            assert result.agents[1].name == "another-agent"
-
-            await session.destroy()
-            await client.stop()
-        finally:
-            await client.force_stop()
+        session = await client.create_session(
+            {
+                "on_permission_request": PermissionHandler.approve_all,
+                "custom_agents": [
+                    {
+                        "name": "test-agent",
+                        "display_name": "Test Agent",
+                        "description": "A test agent",
+                        "prompt": "You are a test agent.",
+                    },
+                    {
+                        "name": "another-agent",
+                        "display_name": "Another Agent",
+                        "description": "Another test agent",
+                        "prompt": "You are another agent.",
+                    },
+                ],
+            }
+        )
+
+        result = await session.rpc.agent.list()
+        assert result.agents is not None
+        assert len(result.agents) == 2
+        assert result.agents[0].name == "test-agent"
+        assert result.agents[0].display_name == "Test Agent"
+        assert result.agents[0].description == "A test agent"
+        assert result.agents[1].name == "another-agent"
+
+        await session.destroy()
 
     @pytest.mark.asyncio
-    async def test_should_return_null_when_no_agent_is_selected(self):
+    async def test_should_return_null_when_no_agent_is_selected(
+        self, client: CopilotClient, single_agent_config: SessionConfig
+    ):
         """Test getCurrent returns null when no agent is selected."""
-        client = CopilotClient({"cli_path": CLI_PATH, "use_stdio": True})
-
-        try:
-            await client.start()
-            session = await client.create_session(
-                {
-                    "on_permission_request": PermissionHandler.approve_all,
-                    "custom_agents": [
-                        {
-                            "name": "test-agent",
-                            "display_name": "Test Agent",
-                            "description": "A test agent",
-                            "prompt": "You are a test agent.",
-                        }
-                    ],
-                }
-            )
-
-            result = await session.rpc.agent.get_current()
-            assert result.agent is None
-
-            await session.destroy()
-            await client.stop()
-        finally:
-            await client.force_stop()
+        session = await client.create_session(single_agent_config)
+
+        result = await session.rpc.agent.get_current()
+        assert result.agent is None
+
+        await session.destroy()
 
     @pytest.mark.asyncio
-    async def test_should_select_and_get_current_agent(self):
+    async def test_should_select_and_get_current_agent(
+        self, client: CopilotClient, single_agent_config: SessionConfig
+    ):
         """Test selecting an agent and verifying getCurrent returns it."""
-        client = CopilotClient({"cli_path": CLI_PATH, "use_stdio": True})
-
-        try:
-            await client.start()
-            session = await client.create_session(
-                {
-                    "on_permission_request": PermissionHandler.approve_all,
-                    "custom_agents": [
-                        {
-                            "name": "test-agent",
-                            "display_name": "Test Agent",
-                            "description": "A test agent",
-                            "prompt": "You are a test agent.",
-                        }
-                    ],
-                }
-            )
-
-            # Select the agent
-            select_result = await session.rpc.agent.select(
-                SessionAgentSelectParams(name="test-agent")
-            )
-            assert select_result.agent is not None
-            assert select_result.agent.name == "test-agent"
-            assert select_result.agent.display_name == "Test Agent"
-
-            # Verify getCurrent returns the selected agent
-            current_result = await session.rpc.agent.get_current()
-            assert current_result.agent is not None
-            assert current_result.agent.name == "test-agent"
-
-            await session.destroy()
-            await client.stop()
-        finally:
-            await client.force_stop()
+        session = await client.create_session(single_agent_config)
+
+        # Select the agent
+        select_result = await session.rpc.agent.select(_SELECT_TEST_AGENT)
+        assert select_result.agent is not None
+        assert select_result.agent.name == "test-agent"
+        assert select_result.agent.display_name == "Test Agent"
+
+        # Verify getCurrent returns the selected agent
+        current_result = await session.rpc.agent.get_current()
+        assert current_result.agent is not None
+        assert current_result.agent.name == "test-agent"
+
+        await session.destroy()
 
     @pytest.mark.asyncio
-    async def test_should_deselect_current_agent(self):
+    async def test_should_deselect_current_agent(
+        self, client: CopilotClient, single_agent_config: SessionConfig
+    ):
         """Test deselecting the current agent."""
-        client = CopilotClient({"cli_path": CLI_PATH, "use_stdio": True})
-
-        try:
-            await client.start()
-            session = await client.create_session(
-                {
-                    "on_permission_request": PermissionHandler.approve_all,
-                    "custom_agents": [
-                        {
-                            "name": "test-agent",
-                            "display_name": "Test Agent",
-                            "description": "A test agent",
-                            "prompt": "You are a test agent.",
-                        }
-                    ],
-                }
-            )
-
-            # Select then deselect
-            await session.rpc.agent.select(SessionAgentSelectParams(name="test-agent"))
-            await session.rpc.agent.deselect()
-
-            # Verify no agent is selected
-            current_result = await session.rpc.agent.get_current()
-            assert current_result.agent is None
-
-            await session.destroy()
-            await client.stop()
-        finally:
-            await client.force_stop()
+        session = await client.create_session(single_agent_config)
+
+        # Select then deselect
+        await session.rpc.agent.select(_SELECT_TEST_AGENT)
+        await session.rpc.agent.deselect()
+
+        # Verify no agent is selected
+        current_result = await session.rpc.agent.get_current()
+        assert current_result.agent is None
+
+        await session.destroy()
 
     @pytest.mark.asyncio
-    async def test_should_return_empty_list_when_no_custom_agents_configured(self):
+    async def test_should_return_empty_list_when_no_custom_agents_configured(
+        self, client: CopilotClient
+    ):
         """Test listing agents returns empty when none configured."""
-        client = CopilotClient({"cli_path": CLI_PATH, "use_stdio": True})
-
-        try:
-            await client.start()
-            session = await client.create_session(
-                {"on_permission_request": PermissionHandler.approve_all}
-            )
+        session = await client.create_session(
+            {"on_permission_request": PermissionHandler.approve_all}
+        )
 
-            result = await session.rpc.agent.list()
-            assert result.agents == []
+        result = await session.rpc.agent.list()
+        assert result.agents == []
 
-            await session.destroy()
-            await client.stop()
-        finally:
-            await client.force_stop()
+        await session.destroy()
 
 
 class TestSessionCompactionRpc:
@@ -121,6 +121,64 @@ class TestURLParsing:
         assert client._is_external_server
 
 
+class TestAsyncContextManager:
+    @staticmethod
+    def _recording_client(calls: list, fail_start: bool = False, fail_stop: bool = False):
+        client = CopilotClient({"cli_url": "localhost:3000"})
+
+        async def start():
+            calls.append("start")
+            if fail_start:
+                raise RuntimeError("start failed")
+
+        async def stop():
+            calls.append("stop")
+            if fail_stop:
+                raise RuntimeError("stop failed")
+            return []
+
+        async def force_stop():
+            calls.append("force_stop")
+
+        client.start = start
+        client.stop = stop
+        client.force_stop = force_stop
+        return client
+
+    @pytest.mark.asyncio
+    async def test_starts_and_stops_gracefully(self):
+        calls = []
+        client = self._recording_client(calls)
+        async with client as entered:
+            assert entered is client
+            assert calls == ["start"]
+        assert calls == ["start", "stop"]
+
+    @pytest.mark.asyncio
+    async def test_force_stops_when_block_raises(self):
+        calls = []
+        with pytest.raises(RuntimeError, match="boom"):
+            async with self._recording_client(calls):
+                raise RuntimeError("boom")
+        assert calls == ["start", "force_stop"]
+
+    @pytest.mark.asyncio
+    async def test_force_stops_when_start_fails(self):
+        calls = []
+        with pytest.raises(RuntimeError, match="start failed"):
+            async with self._recording_client(calls, fail_start=True):
+                pytest.fail("block must not run when start fails")
+        assert calls == ["start", "force_stop"]
+
+    @pytest.mark.asyncio
+    async def test_force_stops_when_stop_fails(self):
+        calls = []
+        with pytest.raises(RuntimeError, match="stop failed"):
+            async with self._recording_client(calls, fail_stop=True):
+                pass
+        assert calls == ["start", "stop", "force_stop"]
+
+
 class TestAuthOptions:
     def test_accepts_github_token(self):
         client = CopilotClient(